@@ -0,0 +1,132 @@
+// static/status.js
+// /events(SSE)로 바뀐 최상위 필드만 받아 상태 페이지를 다시 그린다. 페이지 새로고침이 필요 없다.
+(function () {
+    const snapshotElement = document.getElementById('status-snapshot');
+    let state = JSON.parse(snapshotElement.textContent);
+    let version = snapshotElement.dataset.version;
+
+    const mib = (value) => Math.floor((value || 0) / 1048576);
+    const statusClass = (value) => String(value).toLowerCase().replace(/ /g, '-').replace(/[()]/g, '');
+
+    // data-field 이름 -> 표시 문자열 (템플릿의 Jinja 표현과 같은 형식)
+    const fields = {
+        swap_status: (s) => s.swap_status,
+        cgroup_status: (s) => s.cgroup_status,
+        container_state: (s) => `${s.container_name}: ${s.container_state}`,
+        pid: (s) => (s.pid > 0 ? s.pid : 'N/A'),
+        memory_limit_set: (s) => s.memory_limit_set,
+        swap_limit_set: (s) => s.swap_limit_set,
+        memory_usage: (s) => s.memory_usage,
+        swap_usage: (s) => s.swap_usage,
+        memory_high: (s) => `${s.memory_high} (stall ${s.memory_pressure})`,
+        reclaim_state: (s) => `${s.reclaim_state} (누적 ${mib(s.reclaimed_bytes)} MiB)`,
+        working_set: (s) => s.working_set + (s.memory_protection !== 'N/A' ? ` (${s.memory_protection})` : ''),
+        swap_breakdown: (s) => s.swap_breakdown,
+        usage_source: (s) => s.usage_source,
+        swap_mode: (s) => s.swap_mode + (s.swap_mode === 'loop' ? ` (${s.loop_device}, direct I/O ${s.loop_direct_io})` : ''),
+        swap_io: (s) => {
+            if (!s.swap_io) return '';
+            const devices = Object.entries(s.swap_io.devices || {})
+                .map(([name, device]) => `; ${name} r ${device.read_latency_ms}ms / w ${device.write_latency_ms}ms`).join('');
+            return `in ${s.swap_io.swap_in_mb_s} MB/s, out ${s.swap_io.swap_out_mb_s} MB/s, major fault ${s.swap_io.major_faults_s}/s${devices}`;
+        },
+        swap_creation_time: (s) => s.swap_creation_time,
+        swappiness: (s) => s.swappiness,
+        last_updated: (s) => s.last_updated,
+        status_message: (s) => s.status_message,
+        startup: (s) => {
+            if (!s.startup) return '';
+            const steps = s.startup.steps
+                .map((step) => `; ${step.name} ${step.state}${step.duration_s !== null ? ` ${step.duration_s}s` : ''}`).join('');
+            return `${s.startup.state} (${s.startup.total_s}s)${steps}`;
+        },
+        shutdown_progress: (s) => {
+            const progress = s.shutdown_progress;
+            if (!progress) return '';
+            let text = `${progress.phase} (${progress.elapsed_s}s / ${progress.budget_s}s)`;
+            if (progress.area) {
+                const left = progress.used_kb_now !== null && progress.used_kb_now !== undefined ? Math.floor(progress.used_kb_now / 1024) : 'N/A';
+                text += ` - ${progress.area}: ${left} MiB 남음`;
+            }
+            return text;
+        },
+        error: (s) => s.error || '',
+    };
+
+    // data-row 이름 -> 행 표시 여부
+    const rows = {
+        container_state: (s) => s.container_state !== 'N/A',
+        memory_high: (s) => s.memory_high !== 'N/A',
+        reclaim_state: (s) => s.reclaim_state !== 'N/A',
+        working_set: (s) => s.working_set !== 'N/A',
+        swap_breakdown: (s) => s.swap_breakdown !== 'N/A',
+        swap_io: (s) => Boolean(s.swap_io),
+        startup: (s) => Boolean(s.startup),
+        shutdown_progress: (s) => Boolean(s.shutdown_progress),
+        error: (s) => Boolean(s.error),
+    };
+
+    // data-list 이름 -> [라벨, 값] 목록 (항목이 하나뿐이면 표시하지 않는다)
+    const lists = {
+        targets: (s) => (s.targets || []).map((t) => [`대상 ${t.name}:`,
+            `PID ${t.pid > 0 ? t.pid : 'N/A'}, ${t.cgroup_name} (${t.cgroup_status}), 메모리 ${t.memory_usage} / ${t.memory_limit_set}, 스왑 ${t.swap_usage} / ${t.swap_limit_set}`
+            + (t.memory_high !== 'N/A' ? `, memory.high ${t.memory_high} (stall ${t.memory_pressure})` : '')
+            + (t.reclaim_state !== 'N/A' ? `, 선제 회수 ${t.reclaim_state}` : '')
+            + (t.working_set !== 'N/A' ? `, 워킹셋 ${t.working_set}` : '')
+            + (t.container_state !== 'N/A' ? `, 컨테이너 ${t.container_state}` : '')
+            + (t.error ? ` - ${t.error}` : '')]),
+        swap_areas: (s) => (s.swap_areas || []).map((a, index) => [`스왑 영역 ${index + 1}:`,
+            `${a.file_path} (${a.size}, ${a.mode}${a.loop_device !== 'N/A' ? ', ' + a.loop_device : ''}) - ${a.status}`]),
+        swap_tiers: (s) => (s.swap_tiers || []).map((t) => [`스왑 계층 ${t.tier}:`,
+            (t.tier === 'zswap'
+                ? `pool ${Math.floor((t.pool_kb || 0) / 1024)} MiB, 저장 ${Math.floor((t.stored_kb || 0) / 1024)} MiB`
+                : `${Math.floor(t.used_kb / 1024)} / ${Math.floor(t.size_kb / 1024)} MiB, 우선순위 ${t.priority}`)
+            + (t.compression_ratio ? `, 압축률 ${t.compression_ratio}x` : '')
+            + (t.writeback_stored_bytes !== undefined ? `, writeback ${mib(t.writeback_stored_bytes)} MiB` : '')]),
+    };
+
+    function render() {
+        document.querySelectorAll('[data-field]').forEach((element) => {
+            const format = fields[element.dataset.field];
+            if (!format) return;
+            const text = String(format(state));
+            if (element.textContent !== text) element.textContent = text;
+            if (element.dataset.field === 'swap_status' || element.dataset.field === 'cgroup_status') {
+                element.className = `status-value ${statusClass(text)}`;
+            }
+        });
+        document.querySelectorAll('[data-row]').forEach((element) => {
+            const visible = rows[element.dataset.row];
+            if (visible) element.hidden = !visible(state);
+        });
+        document.querySelectorAll('[data-list]').forEach((container) => {
+            const items = lists[container.dataset.list](state);
+            container.replaceChildren(...(items.length > 1 ? items : []).map(([label, value]) => {
+                const item = document.createElement('div');
+                item.className = 'status-item';
+                const labelElement = document.createElement('span');
+                labelElement.className = 'status-label';
+                labelElement.textContent = label;
+                const valueElement = document.createElement('span');
+                valueElement.className = 'status-value';
+                valueElement.textContent = value;
+                item.append(labelElement, valueElement);
+                return item;
+            }));
+        });
+    }
+
+    if (!window.EventSource) return;
+    const source = new EventSource(`/events?since=${encodeURIComponent(version)}`);
+    // snapshot: 전체 상태 (처음 연결했거나 서버의 변경 기록보다 뒤처졌을 때), patch: 바뀐 필드만
+    source.addEventListener('snapshot', (event) => {
+        state = JSON.parse(event.data);
+        version = event.lastEventId;
+        render();
+    });
+    source.addEventListener('patch', (event) => {
+        Object.assign(state, JSON.parse(event.data));
+        version = event.lastEventId;
+        render();
+    });
+})();
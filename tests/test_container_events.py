@@ -0,0 +1,232 @@
+# tests/test_container_events.py
+# Docker 이벤트 처리(on_container_event)와 ContainerEventWatcher 를 로컬 가짜 Docker API 소켓으로 검사한다.
+# 실행: python -m pytest tests  (또는 python -m unittest discover tests)
+import json
+import os
+import queue
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler
+from unittest import mock
+
+TEST_DIR = tempfile.mkdtemp(prefix="swap-manager-test-")
+os.environ.setdefault("LOG_FILE", os.path.join(TEST_DIR, "swap_manager.log"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import docker  # noqa: E402
+
+import app  # noqa: E402
+
+
+class FakeDockerAPI:
+    """컨테이너 하나(ollama)만 있는 최소한의 Docker Engine API. /events 는 chunked 스트림으로 보낸다."""
+
+    def __init__(self, socket_path, state="running", restart_policy="no", healthcheck=False):
+        self.socket_path = socket_path
+        self.events = queue.Queue()
+        self.requests = []
+        self.state = {"Status": state, "Pid": os.getpid() if state == "running" else 0, "ExitCode": 0}
+        self.restart_policy = restart_policy
+        self.healthcheck = {"Test": ["CMD", "true"]} if healthcheck else {}
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _json(self, obj, code=200):
+                body = json.dumps(obj).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                api.requests.append(("GET", self.path))
+                if self.path.endswith("/_ping"):
+                    self.send_response(200)
+                    self.send_header("Content-Length", "2")
+                    self.end_headers()
+                    self.wfile.write(b"OK")
+                elif self.path.endswith("/version"):
+                    self._json({"ApiVersion": "1.41", "Version": "24.0.0"})
+                elif "/containers/ollama/json" in self.path or "/containers/0123456789abcdef/json" in self.path:
+                    self._json(api.inspect())
+                elif "/events" in self.path:
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Transfer-Encoding", "chunked")
+                    self.end_headers()
+                    try:
+                        while True:
+                            event = api.events.get()
+                            if event is None:
+                                self.wfile.write(b"0\r\n\r\n")
+                                break
+                            data = (json.dumps(event) + "\n").encode()
+                            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                            self.wfile.flush()
+                    except (BrokenPipeError, ConnectionResetError):
+                        pass
+                    self.close_connection = True
+                else:
+                    self._json({"message": "page not found"}, 404)
+
+            def do_POST(self):
+                api.requests.append(("POST", self.path))
+                if "/restart" in self.path:
+                    api.emit("die", exitCode="143")
+                    api.state.update(Status="running", Pid=os.getpid(), ExitCode=0)
+                    api.emit("start")
+                    self.send_response(204)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                else:
+                    self._json({"message": "page not found"}, 404)
+
+        class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+            daemon_threads = True
+
+        self.server = Server(socket_path, Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def inspect(self):
+        return {"Id": "0123456789abcdef", "Name": "/ollama", "State": dict(self.state),
+                "Config": {"Healthcheck": self.healthcheck},
+                "HostConfig": {"RestartPolicy": {"Name": self.restart_policy}}}
+
+    def emit(self, action, **attributes):
+        self.events.put({"Type": "container", "Action": action, "time": int(time.time()),
+                         "Actor": {"ID": "0123456789abcdef", "Attributes": {"name": "ollama", **attributes}}})
+
+    def close(self):
+        self.events.put(None)
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def wait_until(predicate, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return predicate()
+
+
+class ContainerEventTestCase(unittest.TestCase):
+    def setUp(self):
+        self.target = app.ManagedTarget("ollama-test", "/bin/ollama serve", container="ollama")
+        self.wakes = []
+        patcher = mock.patch.object(app.resource_manager, "wake",
+                                    lambda target=None, kind="target": self.wakes.append((target, kind)))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.target.container_info.update(state="running", restart_policy="no")
+
+
+class OnContainerEventTest(ContainerEventTestCase):
+    def test_die_without_restart_policy_requests_restart(self):
+        app.on_container_event(self.target, "die", {"exitCode": "137"})
+        self.assertEqual(self.target.restart_deadline, float("inf"))
+        self.assertIn((self.target, "restart"), self.wakes)
+        self.assertEqual(self.target.container_info["exit_code"], 137)
+        self.assertEqual(self.target.container_info["state"], "exited")
+
+    def test_die_with_docker_restart_policy_waits_for_docker(self):
+        self.target.container_info["restart_policy"] = "unless-stopped"
+        app.on_container_event(self.target, "die", {"exitCode": "1"})
+        self.assertNotIn((self.target, "restart"), self.wakes)
+        self.assertTrue(time.monotonic() < self.target.restart_deadline < float("inf"))
+
+    def test_die_during_own_restart_is_ignored(self):
+        self.target.restart_deadline = float("inf")
+        app.on_container_event(self.target, "die", {"exitCode": "143"})
+        self.assertNotIn((self.target, "restart"), self.wakes)
+        self.assertEqual(self.target.restart_deadline, float("inf"))
+
+    def test_die_with_restart_disabled_only_reports(self):
+        self.target.restart_policy = "none"
+        app.on_container_event(self.target, "die", {"exitCode": "0"})
+        self.assertEqual(self.target.restart_deadline, 0.0)
+        self.assertIn("exited", self.target.status["status_message"])
+
+    def test_health_status_healthy_wakes_target(self):
+        app.on_container_event(self.target, "health_status: unhealthy", {})
+        self.assertNotIn((self.target, "target"), self.wakes)
+        app.on_container_event(self.target, "health_status: healthy", {})
+        self.assertEqual(self.target.container_info["health"], "healthy")
+        self.assertIn((self.target, "target"), self.wakes)
+
+    def test_oom_is_counted(self):
+        app.on_container_event(self.target, "oom", {})
+        app.on_container_event(self.target, "oom", {})
+        self.assertEqual(self.target.container_info["oom_kills"], 2)
+        self.assertIn("OOM 2x", self.target.status["container_state"])
+
+
+class ContainerEventWatcherTest(ContainerEventTestCase):
+    def setUp(self):
+        super().setUp()
+        self.socket_path = os.path.join(tempfile.mkdtemp(dir=TEST_DIR), "docker.sock")
+
+    def start_api(self, **kwargs):
+        api = FakeDockerAPI(self.socket_path, **kwargs)
+        client = docker.DockerClient(base_url=f"unix://{self.socket_path}", version="1.41")
+        patcher = mock.patch.object(app, "docker_client", client)
+        patcher.start()
+        watcher = app.ContainerEventWatcher(client, [self.target])
+        watcher.start()
+
+        def cleanup():
+            watcher.stop()
+            api.close()
+            watcher.join(3)
+            patcher.stop()
+            client.close()
+        self.addCleanup(cleanup)
+        return api, watcher
+
+    def test_subscribe_caches_handle_and_pid_namespace(self):
+        api, _ = self.start_api()
+        self.assertTrue(wait_until(lambda: self.target.docker_container is not None))
+        info = self.target.container_info
+        self.assertEqual(info["pid"], os.getpid())
+        self.assertEqual(info["pid_namespace"], app.process_pid_namespace(os.getpid()))
+        self.assertEqual(info["id"], "0123456789ab")
+
+        inspects = sum(1 for method, path in api.requests if path.endswith("/json"))
+        self.assertTrue(app.restart_container(self.target))
+        # 캐시한 핸들로 재시작하므로 이름으로 다시 조회하지 않는다
+        self.assertEqual(sum(1 for method, path in api.requests if path.endswith("/json")), inspects)
+
+    def test_start_event_wakes_target(self):
+        api, _ = self.start_api()
+        self.assertTrue(wait_until(lambda: self.target.docker_container is not None))
+        api.emit("start")
+        self.assertTrue(wait_until(lambda: (self.target, "target") in self.wakes))
+
+    def test_start_event_with_healthcheck_waits_for_healthy(self):
+        api, _ = self.start_api(healthcheck=True)
+        self.assertTrue(wait_until(lambda: self.target.docker_container is not None))
+        api.emit("start")
+        self.assertTrue(wait_until(lambda: self.target.container_info["last_event"] == "start"))
+        self.assertNotIn((self.target, "target"), self.wakes)
+        api.emit("health_status: healthy")
+        self.assertTrue(wait_until(lambda: (self.target, "target") in self.wakes))
+
+    def test_resync_restarts_container_that_died_while_unsubscribed(self):
+        self.start_api(state="exited")
+        self.assertTrue(wait_until(lambda: (self.target, "restart") in self.wakes))
+        self.assertEqual(self.target.restart_deadline, float("inf"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+# tests/test_metrics_log.py
+# 영구 메트릭 로그(MetricsLog)의 세그먼트 파일 형식, 재시작 후 복구, 보관 정책, 구간 조회를 임시 디렉터리로 검사한다.
+# 실행: python -m pytest tests  (또는 python -m unittest discover tests)
+import os
+import struct
+import sys
+import tempfile
+import unittest
+
+TEST_DIR = tempfile.mkdtemp(prefix="swap-manager-test-")
+os.environ.setdefault("LOG_FILE", os.path.join(TEST_DIR, "swap_manager.log"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+
+HEADER = app.METRICS_LOG_HEADER_SIZE
+RECORD = app.METRICS_LOG_RECORD_SIZE
+
+
+class MetricsLogTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(dir=TEST_DIR)
+
+    def open_log(self, records_per_segment=4, max_bytes=1 << 30):
+        log = app.MetricsLog(self.directory, HEADER + records_per_segment * RECORD, max_bytes)
+        self.addCleanup(log.close)
+        return log
+
+    def fill(self, log, start, count, name="swap_used"):
+        for index in range(count):
+            log.append(start + index, {name: index * 10.0})
+
+    def segment_paths(self, log, name="swap_used"):
+        return [path for _, path in log.segments[name]]
+
+
+class SegmentFormatTest(MetricsLogTestCase):
+    def test_records_are_little_endian_like_the_header(self):
+        log = self.open_log()
+        log.append(1000.5, {"swap_used": 42.0})
+        log.close()
+        with open(self.segment_paths(log)[0], "rb") as f:
+            data = f.read()
+        self.assertEqual(data[:len(app.METRICS_LOG_MAGIC)], app.METRICS_LOG_MAGIC)
+        self.assertEqual(struct.unpack_from("<Q", data, len(app.METRICS_LOG_MAGIC))[0], RECORD)
+        self.assertEqual(data[HEADER:], struct.pack("<dd", 1000.5, 42.0))
+
+    def test_segments_roll_over_at_segment_size(self):
+        log = self.open_log(records_per_segment=4)
+        self.fill(log, 1000, 10)
+        paths = self.segment_paths(log)
+        self.assertEqual(len(paths), 3)
+        self.assertEqual([os.path.getsize(path) for path in paths], [HEADER + 4 * RECORD] * 2 + [HEADER + 2 * RECORD])
+        # 파일명이 세그먼트의 첫 레코드 시각(ms)이다
+        self.assertEqual([os.path.basename(path) for path in paths], ["1000000.bin", "1004000.bin", "1008000.bin"])
+
+
+class ReopenTest(MetricsLogTestCase):
+    def test_reopen_cuts_partial_last_record(self):
+        log = self.open_log(records_per_segment=8)
+        self.fill(log, 1000, 3)
+        log.close()
+        path = self.segment_paths(log)[-1]
+        with open(path, "ab") as f:
+            f.write(struct.pack("<d", 1003.0)[:5])  # 레코드를 쓰다 멈춘 상태
+
+        reopened = self.open_log(records_per_segment=8)
+        reopened.append(1004, {"swap_used": 99.0})
+        self.assertEqual(os.path.getsize(path), HEADER + 4 * RECORD)
+        self.assertEqual(list(reopened.iter_range("swap_used", 0, 2000)),
+                         [(1000.0, 0.0), (1001.0, 10.0), (1002.0, 20.0), (1004.0, 99.0)])
+
+    def test_reopen_replaces_segment_with_partial_header(self):
+        log = self.open_log()
+        self.fill(log, 1000, 5)
+        log.close()
+        partial = os.path.join(os.path.dirname(self.segment_paths(log)[0]), "1005000.bin")
+        with open(partial, "wb") as f:
+            f.write(app.METRICS_LOG_MAGIC[:3])
+
+        reopened = self.open_log()
+        reopened.append(1006, {"swap_used": 60.0})
+        self.assertFalse(os.path.exists(partial))
+        self.assertEqual([timestamp for timestamp, _ in reopened.iter_range("swap_used", 0, 2000)],
+                         [1000.0, 1001.0, 1002.0, 1003.0, 1004.0, 1006.0])
+
+
+class RetentionTest(MetricsLogTestCase):
+    def test_oldest_segments_are_removed_over_max_bytes(self):
+        segment = HEADER + 4 * RECORD
+        log = self.open_log(records_per_segment=4, max_bytes=3 * segment)
+        self.fill(log, 1000, 24)
+        self.assertLessEqual(log.disk_bytes(), 3 * segment)
+        timestamps = [timestamp for timestamp, _ in log.iter_range("swap_used", 0, 2000)]
+        self.assertEqual(timestamps, [float(t) for t in range(1012, 1024)])
+        self.assertEqual(len(os.listdir(os.path.dirname(self.segment_paths(log)[0]))), 3)
+
+    def test_segment_being_written_is_kept(self):
+        log = self.open_log(records_per_segment=4, max_bytes=1)
+        self.fill(log, 1000, 6)
+        self.assertEqual([timestamp for timestamp, _ in log.iter_range("swap_used", 0, 2000)], [1004.0, 1005.0])
+
+
+class RangeQueryTest(MetricsLogTestCase):
+    def test_range_spanning_several_segments(self):
+        log = self.open_log(records_per_segment=4)
+        self.fill(log, 1000, 20)
+        self.assertEqual(len(log.segments["swap_used"]), 5)
+        result = list(log.iter_range("swap_used", 1002.5, 1013))
+        self.assertEqual([timestamp for timestamp, _ in result], [float(t) for t in range(1003, 1013)])
+        self.assertEqual(result[0][1], 30.0)
+
+    def test_range_boundaries_on_segment_starts(self):
+        log = self.open_log(records_per_segment=4)
+        self.fill(log, 1000, 12)
+        # since 는 포함, until 은 제외
+        self.assertEqual([t for t, _ in log.iter_range("swap_used", 1004, 1008)], [1004.0, 1005.0, 1006.0, 1007.0])
+        self.assertEqual(list(log.iter_range("swap_used", 1020, 1030)), [])
+        self.assertEqual(list(log.iter_range("swap_used", 0, 1000)), [])
+
+    def test_range_after_reopen_uses_segments_on_disk(self):
+        log = self.open_log(records_per_segment=4)
+        self.fill(log, 1000, 10)
+        log.close()
+        reopened = self.open_log(records_per_segment=4)
+        self.assertEqual([t for t, _ in reopened.iter_range("swap_used", 1003, 1009)],
+                         [1003.0, 1004.0, 1005.0, 1006.0, 1007.0, 1008.0])
+
+
+if __name__ == "__main__":
+    unittest.main()